@@ -10,10 +10,21 @@ from flask_cors import CORS
 import requests
 import os
 import json
+import mmap
+import struct
+import zlib
+import tempfile
+import threading
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from functools import lru_cache
 import time
 
+try:
+    import fcntl
+except ImportError:  # Windows: không có fcntl -> chỉ dùng cache dict
+    fcntl = None
+
 app = Flask(__name__)
 CORS(app)
 
@@ -62,17 +73,145 @@ def _classify_shopee_failure(status_code: int, data_obj, raw_text: str):
 CACHE = {}
 CACHE_TTL = 7200  # 2 giờ
 
+# Cache dùng chung giữa các worker (server.py bật trước khi fork)
+SHARED_CACHE = None
+
+# ========== SHARED MEMORY CACHE ==========
+class SharedCache:
+    """
+    Cache key -> JSON nằm trên vùng mmap ẩn danh (MAP_SHARED).
+    Tạo TRƯỚC khi fork thì mọi worker cùng nhìn thấy 1 vùng nhớ:
+    hit ở worker này cũng là hit ở worker khác.
+
+    Bảng băm set-associative: `slots` ô, mỗi ô `slot_bytes` byte,
+    chia thành nhóm WAYS ô. Mỗi ô: header (expire, key_len, val_len)
+    + key + value (JSON utf-8). Value quá lớn so với ô thì bỏ qua.
+
+    Khoá theo stripe = fcntl.lockf trên 1 byte của file tạm: kernel tự nhả
+    khi process giữ khoá chết (worker bị kill giữa chừng không làm treo
+    các worker khác). lockf tính theo process nên thêm threading.Lock
+    cho các thread trong cùng 1 worker.
+    """
+
+    WAYS = 4
+    LOCK_STRIPES = 64
+    _HEADER = struct.Struct("<dII")
+
+    def __init__(self, slots: int = 1024, slot_bytes: int = 65536):
+        slots = max(self.WAYS, int(slots))
+        self.sets = slots // self.WAYS
+        self.slots = self.sets * self.WAYS
+        self.slot_bytes = max(self._HEADER.size + 256, int(slot_bytes))
+        self.buf = mmap.mmap(-1, self.slots * self.slot_bytes)
+        self.stripes = min(self.LOCK_STRIPES, self.sets)
+        # File đã unlink, fd giữ mở suốt đời process (đóng fd = mất mọi lockf)
+        self._lock_file = tempfile.TemporaryFile()
+        self._thread_locks = [threading.Lock() for _ in range(self.stripes)]
+
+    @contextmanager
+    def _lock(self, stripe: int):
+        with self._thread_locks[stripe]:
+            fd = self._lock_file.fileno()
+            fcntl.lockf(fd, fcntl.LOCK_EX, 1, stripe)
+            try:
+                yield
+            finally:
+                fcntl.lockf(fd, fcntl.LOCK_UN, 1, stripe)
+
+    def _locate(self, kb: bytes):
+        set_idx = zlib.crc32(kb) % self.sets
+        first = set_idx * self.WAYS
+        return range(first, first + self.WAYS), self._lock(set_idx % self.stripes)
+
+    def _read_header(self, slot: int):
+        return self._HEADER.unpack_from(self.buf, slot * self.slot_bytes)
+
+    def _key_at(self, slot: int, key_len: int) -> bytes:
+        start = slot * self.slot_bytes + self._HEADER.size
+        return self.buf[start:start + key_len]
+
+    def get(self, key):
+        kb = key.encode("utf-8")
+        slots, lock = self._locate(kb)
+        now = time.time()
+        raw = None
+        with lock:
+            for slot in slots:
+                expire, key_len, val_len = self._read_header(slot)
+                if key_len != len(kb) or self._key_at(slot, key_len) != kb:
+                    continue
+                if now >= expire:
+                    self._HEADER.pack_into(self.buf, slot * self.slot_bytes, 0.0, 0, 0)
+                    return None
+                start = slot * self.slot_bytes + self._HEADER.size + key_len
+                raw = self.buf[start:start + val_len]
+                break
+        if raw is None:
+            return None
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return None
+
+    def set(self, key, value, ttl) -> bool:
+        kb = key.encode("utf-8")
+        vb = json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        if self._HEADER.size + len(kb) + len(vb) > self.slot_bytes:
+            return False
+
+        slots, lock = self._locate(kb)
+        now = time.time()
+        with lock:
+            # Ưu tiên: cùng key > ô trống/hết hạn > ô sắp hết hạn nhất
+            target, target_expire = None, None
+            for slot in slots:
+                expire, key_len, _ = self._read_header(slot)
+                if key_len == len(kb) and self._key_at(slot, key_len) == kb:
+                    target = slot
+                    break
+                if key_len == 0 or now >= expire:
+                    expire = 0.0
+                if target is None or expire < target_expire:
+                    target, target_expire = slot, expire
+
+            # Xoá header trước khi ghi: process chết giữa chừng thì ô chỉ
+            # bị trống, không để lại header cũ trỏ vào dữ liệu ghi dở
+            offset = target * self.slot_bytes
+            self._HEADER.pack_into(self.buf, offset, 0.0, 0, 0)
+            start = offset + self._HEADER.size
+            self.buf[start:start + len(kb)] = kb
+            self.buf[start + len(kb):start + len(kb) + len(vb)] = vb
+            self._HEADER.pack_into(self.buf, offset, now + ttl, len(kb), len(vb))
+        return True
+
+def enable_shared_cache(slots: int = 1024, slot_bytes: int = 65536) -> SharedCache:
+    """Bật cache dùng chung. Phải gọi trong process cha, TRƯỚC khi fork worker."""
+    global SHARED_CACHE
+    SHARED_CACHE = SharedCache(slots=slots, slot_bytes=slot_bytes)
+    return SHARED_CACHE
+
 # ========== CACHE FUNCTIONS ==========
 def get_cache(key):
+    if SHARED_CACHE is not None:
+        data = SHARED_CACHE.get(key)
+        if data is not None:
+            return data
+        # Miss ở cache chung -> có thể là entry quá lớn đang nằm ở CACHE riêng
     if key in CACHE:
         data, expire = CACHE[key]
         if time.time() < expire:
             return data
         else:
-            del CACHE[key]
+            # Server nhiều thread: thread khác có thể đã xoá trước
+            CACHE.pop(key, None)
     return None
 
 def set_cache(key, value, ttl):
+    if SHARED_CACHE is not None:
+        if SHARED_CACHE.set(key, value, ttl):
+            return
+        # Value quá lớn so với ô -> cache riêng trong worker này
+        print(f"⚠️ Cache entry {key[:30]}... vượt CACHE_SLOT_BYTES={SHARED_CACHE.slot_bytes}, dùng cache riêng của worker")
     CACHE[key] = (value, time.time() + ttl)
 
 # ========== GOOGLE SHEETS - VERIFY SHEET ID ==========
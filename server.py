@@ -0,0 +1,280 @@
+"""
+Production server cho API NgânMiu (ngoài Vercel)
+- Pre-fork N worker, mỗi worker 1 process -> chạy song song trên nhiều core
+- Mỗi worker tối đa T thread (request chủ yếu chờ Shopee/Google -> I/O-bound)
+- Import module + dữ liệu kích hoạt nạp ở process cha TRƯỚC khi fork
+  (worker dùng chung các trang nhớ đó theo copy-on-write)
+- Cache cookie nằm trên shared memory: hit ở worker này = hit ở mọi worker
+
+Chạy:
+    python server.py --workers 4 --threads 16 --port 5000
+Hoặc qua env: WORKERS, THREADS, PORT, REQUEST_TIMEOUT, GRACEFUL_TIMEOUT,
+CACHE_SLOTS, CACHE_SLOT_BYTES
+"""
+
+import argparse
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+import traceback
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+import app as api
+
+# ========== CONFIG ==========
+DEFAULT_WORKERS = os.cpu_count() or 1
+DEFAULT_THREADS = 16
+DEFAULT_PORT = 5000
+DEFAULT_REQUEST_TIMEOUT = 60  # giây chờ client gửi/nhận trên 1 socket
+DEFAULT_GRACEFUL_TIMEOUT = 60  # giây chờ request đang chạy xong khi tắt/restart
+DEFAULT_CACHE_SLOTS = 1024
+DEFAULT_CACHE_SLOT_BYTES = 65536  # 64KB / entry
+BACKLOG = 1024
+
+# Worker chết sớm hơn MIN_WORKER_LIFETIME coi là lỗi khởi động:
+# chờ RESPAWN_DELAY rồi mới fork lại, quá MAX_FAST_FAILURES lần liên tiếp thì dừng
+MIN_WORKER_LIFETIME = 5
+RESPAWN_DELAY = 1
+MAX_FAST_FAILURES = 5
+
+STOP_SIGNALS = {signal.SIGINT, signal.SIGTERM}
+
+class _Shutdown(Exception):
+    pass
+
+# ========== WORKER ==========
+class TimeoutWSGIRequestHandler(WSGIRequestHandler):
+    """Client treo/chậm chỉ giữ 1 thread tối đa `timeout` giây."""
+    timeout = DEFAULT_REQUEST_TIMEOUT
+
+class PreforkWSGIServer(socketserver.ThreadingMixIn, WSGIServer):
+    """
+    WSGIServer dùng lại socket đã listen sẵn ở process cha (không bind lại).
+    Mỗi kết nối 1 thread, tối đa `threads` thread cùng lúc; đủ slot thì
+    worker ngừng accept để các worker khác nhận kết nối.
+
+    Tắt êm: stop() -> ngừng accept, serve_forever() trả về; server_close()
+    chờ các thread request đang chạy xong (thread không phải daemon).
+    """
+    daemon_threads = False
+    block_on_close = True
+
+    def __init__(self, sock, threads: int, handler_class=TimeoutWSGIRequestHandler):
+        socketserver.BaseServer.__init__(self, sock.getsockname(), handler_class)
+        self.socket = sock
+        host, port = sock.getsockname()[:2]
+        self.server_name = socket.getfqdn(host)
+        self.server_port = port
+        self.setup_environ()
+        self._slots = threading.BoundedSemaphore(threads)
+        self._stopping = threading.Event()
+
+    def stop(self):
+        """Gọi được từ signal handler: shutdown() chạy ở thread riêng để không tự chờ chính mình."""
+        self._stopping.set()
+        threading.Thread(target=self.shutdown, daemon=True).start()
+
+    def get_request(self):
+        # Hết slot thì chờ ở đây, trước accept(): kết nối mới để worker khác nhận
+        self._slots.acquire()
+        if self._stopping.is_set():
+            # Đang tắt: để kết nối cho worker khác (OSError -> BaseServer bỏ qua)
+            self._slots.release()
+            raise OSError("server stopping")
+        try:
+            return super().get_request()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def process_request_thread(self, request, client_address):
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            self._slots.release()
+
+    def process_request(self, request, client_address):
+        try:
+            super().process_request(request, client_address)
+        except Exception:
+            self._slots.release()
+            raise
+
+def run_worker(sock, threads: int, timeout: int):
+    code = 1
+    try:
+        # Ctrl+C do process cha xử lý; SIGTERM -> ngừng nhận request mới,
+        # chờ request đang chạy xong rồi thoát (quá hạn thì process cha SIGKILL).
+        # Chỉ bỏ chặn signal SAU khi đã đặt handler của worker.
+        TimeoutWSGIRequestHandler.timeout = timeout
+        server = PreforkWSGIServer(sock, threads)
+        server.set_app(api.app)
+
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, lambda signum, frame: server.stop())
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, STOP_SIGNALS)
+
+        server.serve_forever()
+        server.server_close()
+        code = 0
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        os._exit(code)
+
+# ========== MASTER ==========
+def preload():
+    """Nạp trước các module nặng dùng khi verify Sheet ID, để worker share copy-on-write."""
+    if not os.getenv("GOOGLE_SHEETS_CREDS_JSON"):
+        return
+    try:
+        from google.oauth2 import service_account  # noqa: F401
+        from googleapiclient.discovery import build  # noqa: F401
+    except Exception as e:
+        print(f"⚠️ Preload google client failed: {e}")
+
+def create_listener(host: str, port: int):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(BACKLOG)
+    # Nhiều worker cùng chờ 1 socket: worker không giành được kết nối
+    # thì accept() trả lỗi ngay thay vì block
+    sock.setblocking(False)
+    return sock
+
+def serve(host: str, port: int, workers: int, threads: int, timeout: int,
+          graceful_timeout: int, cache_slots: int, cache_slot_bytes: int) -> bool:
+    """Chạy tới khi nhận SIGINT/SIGTERM. Trả về False nếu dừng vì worker crash liên tục."""
+    if not hasattr(os, "fork"):
+        # Windows: không có fork -> chạy dev server như cũ
+        print("⚠️ os.fork không khả dụng, chạy Flask dev server")
+        api.app.run(host=host, port=port)
+        return True
+
+    api.enable_shared_cache(slots=cache_slots, slot_bytes=cache_slot_bytes)
+    preload()
+    sock = create_listener(host, port)
+
+    children = {}  # pid -> thời điểm fork
+    ok = True
+
+    def stop(signum, frame):
+        raise _Shutdown()
+
+    def spawn():
+        # Chặn signal quanh fork + ghi pid: không có worker nào bị "mồ côi",
+        # và child không chạy nhầm handler của process cha
+        signal.pthread_sigmask(signal.SIG_BLOCK, STOP_SIGNALS)
+        try:
+            pid = os.fork()
+            if pid == 0:
+                run_worker(sock, threads, timeout)
+            children[pid] = time.time()
+        finally:
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, STOP_SIGNALS)
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    try:
+        for _ in range(workers):
+            spawn()
+
+        print(f"🚀 API NgânMiu: http://{host}:{port} | workers={workers} x threads={threads} "
+              f"| cache={cache_slots} x {cache_slot_bytes}B")
+
+        # Worker chết bất thường -> fork lại
+        fast_failures = 0
+        while True:
+            try:
+                pid, _ = os.waitpid(-1, 0)
+            except ChildProcessError:
+                break
+            started = children.pop(pid, None)
+            if started is None:
+                continue
+
+            if time.time() - started < MIN_WORKER_LIFETIME:
+                fast_failures += 1
+                if fast_failures >= MAX_FAST_FAILURES:
+                    print(f"❌ Worker exited {fast_failures} times right after start, stopping")
+                    ok = False
+                    break
+                print(f"⚠️ Worker {pid} exited early, respawning in {RESPAWN_DELAY}s")
+                time.sleep(RESPAWN_DELAY)
+            else:
+                fast_failures = 0
+                print(f"⚠️ Worker {pid} exited, respawning")
+            spawn()
+    except _Shutdown:
+        pass
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+
+    for pid in children:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+    deadline = time.time() + graceful_timeout
+    while children and time.time() < deadline:
+        try:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid == 0:
+            time.sleep(0.1)
+            continue
+        children.pop(pid, None)
+
+    for pid in children:
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+    sock.close()
+    return ok
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="API NgânMiu pre-fork server")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", DEFAULT_PORT)))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WORKERS", DEFAULT_WORKERS)))
+    parser.add_argument("--threads", type=int, default=int(os.getenv("THREADS", DEFAULT_THREADS)),
+                        help="Số request xử lý song song trong 1 worker")
+    parser.add_argument("--timeout", type=int,
+                        default=int(os.getenv("REQUEST_TIMEOUT", DEFAULT_REQUEST_TIMEOUT)),
+                        help="Timeout (giây) cho socket của mỗi kết nối")
+    parser.add_argument("--graceful-timeout", type=int,
+                        default=int(os.getenv("GRACEFUL_TIMEOUT", DEFAULT_GRACEFUL_TIMEOUT)),
+                        help="Thời gian (giây) chờ request đang chạy xong khi tắt server")
+    parser.add_argument("--cache-slots", type=int,
+                        default=int(os.getenv("CACHE_SLOTS", DEFAULT_CACHE_SLOTS)),
+                        help="Số entry tối đa của cache dùng chung")
+    parser.add_argument("--cache-slot-bytes", type=int,
+                        default=int(os.getenv("CACHE_SLOT_BYTES", DEFAULT_CACHE_SLOT_BYTES)),
+                        help="Kích thước tối đa 1 entry (key + JSON)")
+    args = parser.parse_args(argv)
+
+    ok = serve(
+        host=args.host,
+        port=args.port,
+        workers=max(1, args.workers),
+        threads=max(1, args.threads),
+        timeout=max(1, args.timeout),
+        graceful_timeout=max(0, args.graceful_timeout),
+        cache_slots=args.cache_slots,
+        cache_slot_bytes=args.cache_slot_bytes,
+    )
+    if not ok:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
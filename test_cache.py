@@ -0,0 +1,119 @@
+"""
+Test SharedCache (cache dùng chung giữa các worker của server.py)
+Không cần API đang chạy.
+Chạy: python test_cache.py  (hoặc: python -m pytest test_cache.py)
+"""
+
+import os
+import signal
+import time
+
+from app import SharedCache
+
+# ========== HELPERS ==========
+
+def run_in_child(fn):
+    """Chạy fn trong process con (fork), chờ con thoát, trả về exit code."""
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            fn()
+            code = 0
+        finally:
+            os._exit(code)
+    _, status = os.waitpid(pid, 0)
+    return os.waitstatus_to_exitcode(status)
+
+def single_set_cache(slot_bytes=1024):
+    """slots = WAYS -> chỉ 1 nhóm, mọi key rơi vào cùng nhóm."""
+    return SharedCache(slots=SharedCache.WAYS, slot_bytes=slot_bytes)
+
+# ========== TESTS ==========
+
+def test_set_in_child_visible_in_parent():
+    cache = SharedCache(slots=16, slot_bytes=1024)
+    value = {"orders": [], "name": "Ngân"}
+
+    assert run_in_child(lambda: cache.set("k", value, 60)) == 0
+    assert cache.get("k") == value
+
+def test_same_key_overwrite():
+    cache = single_set_cache()
+    cache.set("k", {"v": 1}, 60)
+    cache.set("k", {"v": 2}, 60)
+
+    assert cache.get("k") == {"v": 2}
+    # Ghi đè không chiếm thêm ô: vẫn chứa được WAYS - 1 key khác
+    for i in range(SharedCache.WAYS - 1):
+        cache.set(f"other{i}", i, 60)
+    assert cache.get("k") == {"v": 2}
+
+def test_expired_entry_is_miss():
+    cache = single_set_cache()
+    cache.set("old", 1, -1)
+    assert cache.get("old") is None
+
+def test_evicts_soonest_expiring_when_set_full():
+    cache = single_set_cache()
+    ways = SharedCache.WAYS
+    for i in range(ways):
+        cache.set(f"k{i}", i, 100 + i)  # k0 hết hạn sớm nhất
+
+    cache.set("new", "x", 1000)
+
+    assert cache.get("new") == "x"
+    assert cache.get("k0") is None
+    for i in range(1, ways):
+        assert cache.get(f"k{i}") == i
+
+def test_expired_slot_reused_before_eviction():
+    cache = single_set_cache()
+    ways = SharedCache.WAYS
+    for i in range(ways):
+        cache.set(f"k{i}", i, -1 if i == 2 else 100)
+
+    cache.set("new", "x", 1)  # TTL ngắn hơn mọi key còn hạn
+
+    assert cache.get("new") == "x"
+    for i in range(ways):
+        if i != 2:
+            assert cache.get(f"k{i}") == i
+
+def test_oversize_value_rejected():
+    cache = single_set_cache(slot_bytes=512)
+    assert cache.set("big", {"a": "x" * 1000}, 60) is False
+    assert cache.get("big") is None
+    assert cache.set("small", {"a": "x"}, 60) is True
+
+def test_lock_released_when_holder_killed():
+    cache = SharedCache(slots=16, slot_bytes=1024)
+    r, w = os.pipe()
+
+    pid = os.fork()
+    if pid == 0:
+        try:
+            for stripe in range(cache.stripes):
+                cache._lock(stripe).__enter__()
+            os.write(w, b"1")
+            time.sleep(60)
+        finally:
+            os._exit(0)
+
+    os.read(r, 1)
+    os.kill(pid, signal.SIGKILL)
+    os.waitpid(pid, 0)
+
+    started = time.time()
+    assert cache.set("k", 1, 60) is True
+    assert cache.get("k") == 1
+    assert time.time() - started < 1
+
+# ========== MAIN ==========
+
+if __name__ == "__main__":
+    tests = [v for k, v in list(globals().items()) if k.startswith("test_")]
+    for t in tests:
+        t()
+        print(f"✅ {t.__name__}")
+    print(f"\n✅ {len(tests)} TEST OK")
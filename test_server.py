@@ -0,0 +1,75 @@
+"""
+Test PreforkWSGIServer (worker của server.py) - không fork, không cần API đang chạy.
+Chạy: python test_server.py  (hoặc: python -m pytest test_server.py)
+"""
+
+import threading
+import time
+import urllib.request
+
+from server import PreforkWSGIServer, create_listener
+
+# ========== HELPERS ==========
+
+def start_server(app, threads=1):
+    """Server trên socket đã listen sẵn (giống process cha), serve_forever ở thread riêng."""
+    sock = create_listener("127.0.0.1", 0)
+    server = PreforkWSGIServer(sock, threads)
+    server.set_app(app)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{sock.getsockname()[1]}/"
+    return server, thread, url
+
+def hello_app(environ, start_response):
+    start_response("200 OK", [("Content-Type", "text/plain")])
+    return [b"ok"]
+
+def get(url, timeout=5):
+    with urllib.request.urlopen(url, timeout=timeout) as resp:
+        return resp.status, resp.read()
+
+# ========== TESTS ==========
+
+def test_slot_released_after_each_request():
+    # threads=1: nếu slot không được trả lại thì request thứ 2 treo tới timeout
+    server, thread, url = start_server(hello_app, threads=1)
+    try:
+        assert get(url) == (200, b"ok")
+        assert get(url) == (200, b"ok")
+    finally:
+        server.stop()
+        thread.join(5)
+        server.server_close()
+
+def test_stop_waits_for_inflight_request():
+    started = threading.Event()
+
+    def slow_app(environ, start_response):
+        started.set()
+        time.sleep(0.5)
+        start_response("200 OK", [("Content-Type", "text/plain")])
+        return [b"done"]
+
+    server, thread, url = start_server(slow_app, threads=2)
+    result = {}
+    client = threading.Thread(target=lambda: result.update(resp=get(url)))
+    client.start()
+    assert started.wait(5)
+
+    server.stop()
+    thread.join(5)
+    assert not thread.is_alive()
+    server.server_close()  # chờ thread request xong
+
+    client.join(5)
+    assert result.get("resp") == (200, b"done")
+
+# ========== MAIN ==========
+
+if __name__ == "__main__":
+    tests = [v for k, v in list(globals().items()) if k.startswith("test_")]
+    for t in tests:
+        t()
+        print(f"✅ {t.__name__}")
+    print(f"\n✅ {len(tests)} TEST OK")